@@ -1,5 +1,5 @@
 """Agent modules for the Deep Agent system."""
 
-from agents.orchestrator import graph as orchestrator_graph
+from agents.orchestrator import get_graph as get_orchestrator_graph
 
-__all__ = ["orchestrator_graph"]
+__all__ = ["get_orchestrator_graph"]
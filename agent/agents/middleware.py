@@ -0,0 +1,337 @@
+"""
+Agent middleware for the orchestrator.
+
+Hooks into the model call to keep the static prompt prefix cached on the
+provider side, to show the model the current agent state, to skip the
+model entirely for onboarding answers that can be parsed deterministically,
+and to bound how many model calls a worker has in flight.
+"""
+
+import asyncio
+import logging
+import re
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Optional, Sequence
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.tools import BaseTool
+from langchain_google_genai import ChatGoogleGenerativeAI, create_context_cache
+
+from state import state_to_context
+from tools.onboarding import VALID_ROLES, VALID_TRINITY
+
+logger = logging.getLogger("fractional_quest")
+
+
+# ============================================
+# Gemini Context Cache
+# ============================================
+
+# Refresh the cache handle this many seconds before Gemini expires it
+CACHE_REFRESH_MARGIN = 60
+
+
+class GeminiContextCacheMiddleware(AgentMiddleware):
+    """
+    Serves the system prompt and tool schema from a Gemini CachedContent.
+
+    The cache is created lazily on the first model call and recreated once
+    its TTL runs out. Gemini rejects requests that set `cached_content`
+    alongside a system instruction or tools, so both are stripped from the
+    request while the cache is live. Requests whose tools differ from the
+    cached set (e.g. CopilotKit frontend actions) are passed through untouched.
+    If the cache cannot be created (too few tokens, no API key, ...), calls
+    fall back to the uncached request until the next TTL window.
+    """
+
+    def __init__(
+        self,
+        model: ChatGoogleGenerativeAI,
+        system_prompt: str,
+        tools: Sequence[BaseTool],
+        ttl_seconds: int = 3600,
+    ):
+        super().__init__()
+        self.model = model
+        self.system_prompt = system_prompt
+        self.cached_tools = list(tools)
+        self.ttl_seconds = ttl_seconds
+        self._tool_names = frozenset(t.name for t in self.cached_tools)
+        self._cache_name: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return "GeminiContextCacheMiddleware"
+
+    def _needs_refresh(self) -> bool:
+        return time.monotonic() >= self._expires_at
+
+    def _refresh(self) -> Optional[str]:
+        """Create a fresh cache if the current handle has expired."""
+        with self._lock:
+            if not self._needs_refresh():
+                return self._cache_name
+
+            # Short TTLs would leave no window at all after the full margin
+            margin = min(CACHE_REFRESH_MARGIN, self.ttl_seconds // 2)
+            self._expires_at = time.monotonic() + self.ttl_seconds - margin
+            try:
+                self._cache_name = create_context_cache(
+                    self.model,
+                    [SystemMessage(content=self.system_prompt)],
+                    tools=self.cached_tools,
+                    ttl=f"{self.ttl_seconds}s",
+                )
+                logger.info(f"Created Gemini context cache {self._cache_name}")
+            except Exception as e:
+                self._cache_name = None
+                logger.warning(f"Gemini context cache unavailable, sending full prompt: {e}")
+            return self._cache_name
+
+    def _matches_cache(self, request: ModelRequest) -> bool:
+        """Only requests whose prefix is exactly what was cached can use it."""
+        if request.system_prompt != self.system_prompt:
+            return False
+        if len(request.tools) != len(self._tool_names):
+            return False
+        return all(
+            isinstance(t, BaseTool) and t.name in self._tool_names
+            for t in request.tools
+        )
+
+    def _cached_request(self, request: ModelRequest, cache_name: str) -> ModelRequest:
+        return request.override(
+            system_message=None,
+            tools=[],
+            model_settings={**request.model_settings, "cached_content": cache_name},
+        )
+
+    def wrap_model_call(
+            self,
+            request: ModelRequest,
+            handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        if not self._matches_cache(request):
+            return handler(request)
+
+        cache_name = self._refresh() if self._needs_refresh() else self._cache_name
+        if cache_name is None:
+            return handler(request)
+
+        return handler(self._cached_request(request, cache_name))
+
+    async def awrap_model_call(
+            self,
+            request: ModelRequest,
+            handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        if not self._matches_cache(request):
+            return await handler(request)
+
+        if self._needs_refresh():
+            # Cache creation is a blocking API call; keep it off the event loop
+            cache_name = await asyncio.to_thread(self._refresh)
+        else:
+            cache_name = self._cache_name
+        if cache_name is None:
+            return await handler(request)
+
+        return await handler(self._cached_request(request, cache_name))
+
+
+# ============================================
+# State Context
+# ============================================
+
+class StateContextMiddleware(AgentMiddleware):
+    """
+    Appends the rendered agent state after the conversation history.
+
+    Keeping state out of the system prompt means onboarding updates never
+    change the request prefix, so the cached prompt and earlier turns keep
+    hitting the provider cache. The context message is only added to the
+    model request, not persisted to the thread.
+    """
+
+    @property
+    def name(self) -> str:
+        return "StateContextMiddleware"
+
+    def _with_state(self, request: ModelRequest) -> ModelRequest:
+        context = HumanMessage(
+            content=f"<agent_state>\n{state_to_context(request.state)}\n</agent_state>"
+        )
+        return request.override(messages=[*request.messages, context])
+
+    def _log_cache_usage(self, response: ModelResponse) -> None:
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        for message in response.result:
+            if isinstance(message, AIMessage) and message.usage_metadata:
+                usage = message.usage_metadata
+                cache_read = usage.get("input_token_details", {}).get("cache_read", 0)
+                logger.debug(
+                    f"Model usage: input={usage.get('input_tokens', 0)} "
+                    f"cache_read_input_tokens={cache_read}"
+                )
+
+    def wrap_model_call(
+            self,
+            request: ModelRequest,
+            handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        response = handler(self._with_state(request))
+        self._log_cache_usage(response)
+        return response
+
+    async def awrap_model_call(
+            self,
+            request: ModelRequest,
+            handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        response = await handler(self._with_state(request))
+        self._log_cache_usage(response)
+        return response
+
+
+# ============================================
+# Onboarding Shortcut
+# ============================================
+
+# current_step -> (dispatcher step, dispatcher argument, keywords).
+# "other" and "all" are too ambiguous in free text to match on.
+DETERMINISTIC_STEPS = {
+    "intro": ("role_preference", "role", VALID_ROLES - {"other"}),
+    "role_preference": ("role_preference", "role", VALID_ROLES - {"other"}),
+    "trinity": ("trinity", "engagement_type", VALID_TRINITY - {"all"}),
+}
+
+# Words allowed around the keyword in a reply that cleanly answers the step
+# ("I'm a CTO", "fractional work please"). Negations ("not", "no", "don't",
+# "rather than") and hedges ("maybe") are deliberately absent, so replies
+# containing them always go to the model.
+SHORTCUT_FILLER_WORDS = frozenset({
+    "i", "i'm", "im", "am", "a", "an", "the", "as", "my", "me",
+    "role", "position", "roles", "positions", "work", "engagement", "engagements",
+    "want", "wants", "would", "like", "prefer", "looking", "for", "be", "to",
+    "please", "yes", "yeah", "yep", "definitely",
+})
+
+# Longer replies usually carry more than one answer; leave those to the model
+SHORTCUT_MAX_WORDS = 8
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+class OnboardingShortcutMiddleware(AgentMiddleware):
+    """
+    Answers the model call with a confirm_onboarding_step tool call when the
+    user's reply cleanly fills the slot the current onboarding step expects
+    (e.g. "CTO" while on role_preference).
+
+    Only fresh user turns are considered, and only when the reply is exactly
+    one keyword for the expected slot plus filler words. Questions, negations
+    and hedges go to the model. The model still writes the reply after the
+    tool result, so this removes the tool-selection round-trip only.
+    """
+
+    @property
+    def name(self) -> str:
+        return "OnboardingShortcutMiddleware"
+
+    def _shortcut(self, request: ModelRequest) -> Optional[ModelResponse]:
+        if not request.messages or not isinstance(request.messages[-1], HumanMessage):
+            return None
+
+        onboarding = request.state.get("onboarding") or {}
+        rule = DETERMINISTIC_STEPS.get(onboarding.get("current_step", "intro"))
+        if rule is None or onboarding.get("completed"):
+            return None
+
+        text = request.messages[-1].text.lower().replace("\u2019", "'")
+        if "?" in text:
+            return None
+
+        words = _WORD_RE.findall(text)
+        if not words or len(words) > SHORTCUT_MAX_WORDS:
+            return None
+
+        step, arg, keywords = rule
+        matches = [word for word in words if word not in SHORTCUT_FILLER_WORDS]
+        if len(matches) != 1 or matches[0] not in keywords:
+            return None
+
+        value = matches[0]
+        logger.debug(f"Onboarding shortcut: step={step} {arg}={value}")
+        return ModelResponse(result=[
+            AIMessage(
+                content="",
+                tool_calls=[{
+                    "name": "confirm_onboarding_step",
+                    "args": {"step": step, arg: value},
+                    "id": f"call_{uuid.uuid4().hex}",
+                }],
+            )
+        ])
+
+    def wrap_model_call(
+            self,
+            request: ModelRequest,
+            handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        return self._shortcut(request) or handler(request)
+
+    async def awrap_model_call(
+            self,
+            request: ModelRequest,
+            handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        return self._shortcut(request) or await handler(request)
+
+
+# ============================================
+# Model Concurrency
+# ============================================
+
+class ModelConcurrencyMiddleware(AgentMiddleware):
+    """
+    Caps the number of concurrent model calls in this worker.
+
+    Gemini already batches requests continuously on the provider side, so
+    there is nothing to gain from coalescing calls here; bounding them keeps
+    bursts of simultaneous onboarding turns from tripping rate limits and
+    queues the overflow locally instead.
+    """
+
+    def __init__(self, max_concurrency: int = 16):
+        super().__init__()
+        self.max_concurrency = max_concurrency
+        self._sync_slots = threading.BoundedSemaphore(max_concurrency)
+        self._async_slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def name(self) -> str:
+        return "ModelConcurrencyMiddleware"
+
+    def wrap_model_call(
+            self,
+            request: ModelRequest,
+            handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        with self._sync_slots:
+            return handler(request)
+
+    async def awrap_model_call(
+            self,
+            request: ModelRequest,
+            handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+        async with self._async_slots:
+            return await handler(request)
@@ -8,73 +8,67 @@ Routes requests to appropriate subagents based on context:
 - General questions -> answer directly
 """
 
-# Load environment variables FIRST before any LangChain imports
-from dotenv import load_dotenv
-load_dotenv()
+import functools
+import os
+import re
+from typing import Final
+
+import httpx
+
+# Load environment variables before any LangChain imports, unless the
+# entrypoint (main.py) already did
+if not os.getenv("_ENV_LOADED"):
+    from dotenv import load_dotenv
+    load_dotenv()
+    os.environ["_ENV_LOADED"] = "1"
 
 from langchain.agents import create_agent
+from langchain_core.caches import BaseCache, InMemoryCache
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.memory import MemorySaver
 from copilotkit import CopilotKitMiddleware
 
-from state import AgentState
-from tools.onboarding import (
-    confirm_role_preference,
-    confirm_trinity,
-    confirm_experience,
-    confirm_location,
-    confirm_search_prefs,
-    complete_onboarding,
+from agents.middleware import (
+    GeminiContextCacheMiddleware,
+    ModelConcurrencyMiddleware,
+    OnboardingShortcutMiddleware,
+    StateContextMiddleware,
 )
+from state import AgentState
+from tools.onboarding import confirm_onboarding_step
 
 
 # ============================================
 # System Prompt
 # ============================================
 
-ORCHESTRATOR_PROMPT = """You are the orchestrator for Fractional Quest, a platform helping fractional executives (CTO, CFO, CMO, etc.) find roles.
-
-## Your Role
-You route conversations to the appropriate specialist and maintain overall context. You are warm, professional, and helpful.
-
-## Routing Rules
+_RAW_ORCHESTRATOR_PROMPT = """
+You are the orchestrator for Fractional Quest, a platform helping fractional executives (CTO, CFO, CMO, etc.) find roles. You route conversations, keep overall context, and are warm, professional, and helpful.
 
-1. **Onboarding First**: If onboarding is not complete, guide the user through the onboarding flow. The 6 steps are:
-   - intro: Greet and explain the platform
-   - role_preference: What C-level role are they seeking?
-   - trinity: Fractional, Interim, or Advisory preference?
-   - experience: Years of experience and industries
-   - location: Where are they based and remote preferences
-   - search_prefs: Salary expectations and availability
+## Onboarding
+Until onboarding is complete, guide the user through it. When a user starts a conversation, greet them, briefly explain that Fractional Quest helps fractional executives find roles, and ask what C-level role they're looking for.
 
-2. **After Onboarding**:
-   - Job questions -> Help with job search
-   - Coaching questions -> Help connect with coaches
-   - General questions -> Answer directly
+Confirm each answer with confirm_onboarding_step using the matching step:
+- role_preference: C-level role sought -> role
+- trinity: fractional, interim, or advisory -> engagement_type
+- experience: years and industries -> years, industries
+- location: where they're based and remote preference -> location, remote_preference
+- search_prefs: compensation and availability -> availability, target_compensation (if given)
+- complete: all steps confirmed
 
-## Important Behavior
+## After Onboarding
+Help with job questions, connect coaching questions with coaches, and answer general questions directly.
 
-When a user first says hello or starts a conversation:
-- Warmly greet them
-- Briefly explain that Fractional Quest helps fractional executives find roles
-- Ask what type of C-level role they're looking for (CTO, CFO, CMO, etc.)
-- This starts the onboarding process
+## State
+The latest message may include an <agent_state> block with the user's profile and onboarding progress. It is the source of truth: confirmed values are saved there, and confirm_onboarding_step only returns a short confirmation and the next step. Acknowledge what you already know rather than re-asking.
 
-When the user provides information matching an onboarding step, use the appropriate tool to confirm it:
-- Role mentioned -> use confirm_role_preference
-- Engagement type (fractional/interim/advisory) -> use confirm_trinity
-- Experience details -> use confirm_experience
-- Location info -> use confirm_location
-- Compensation/availability -> use confirm_search_prefs
-- All steps done -> use complete_onboarding
-
-## Tone
-- Professional but warm
-- Concise but thorough
-- Encouraging and supportive
-
-Always acknowledge what you already know about the user rather than re-asking.
+Tone: professional but warm, concise but thorough, encouraging.
 """
 
+# Normalized once at import: every character here is re-sent on cache misses
+ORCHESTRATOR_PROMPT: Final[str] = re.sub(r"\n[ \t]+", "\n", _RAW_ORCHESTRATOR_PROMPT).strip()
+
 
 # ============================================
 # Create the Agent
@@ -82,22 +76,99 @@ Always acknowledge what you already know about the user rather than re-asking.
 
 # Combine all tools
 ALL_TOOLS = [
-    confirm_role_preference,
-    confirm_trinity,
-    confirm_experience,
-    confirm_location,
-    confirm_search_prefs,
-    complete_onboarding,
+    confirm_onboarding_step,
 ]
 
-# Create the agent with CopilotKit middleware for frontend sync
-checkpointer = MemorySaver()
-
-graph = create_agent(
-    model="google_genai:gemini-2.0-flash",
-    tools=ALL_TOOLS,
-    middleware=[CopilotKitMiddleware()],
-    state_schema=AgentState,
-    checkpointer=checkpointer,
-    system_prompt=ORCHESTRATOR_PROMPT,
+# Middleware that does not depend on the model, built once at import.
+# CopilotKit handles frontend sync.
+BASE_MIDDLEWARE = (
+    CopilotKitMiddleware(),
+    OnboardingShortcutMiddleware(),
+    ModelConcurrencyMiddleware(int(os.getenv("MODEL_MAX_CONCURRENCY", "16"))),
+    StateContextMiddleware(),
 )
+
+
+def build_llm_cache() -> BaseCache | None:
+    """
+    Response cache for repeated, identical model calls.
+
+    LLM_CACHE selects the backend: "memory" (default, per worker, last 1000
+    responses), "sqlite" (file at LLM_CACHE_DB, requires langchain-community,
+    which is not installed by default) or "off". Anything else fails startup.
+    """
+    backend = os.getenv("LLM_CACHE", "memory").strip().lower()
+    if backend == "off":
+        return None
+    if backend == "memory":
+        return InMemoryCache(maxsize=1000)
+    if backend == "sqlite":
+        try:
+            from langchain_community.cache import SQLiteCache
+        except ImportError as e:
+            raise RuntimeError(
+                "LLM_CACHE=sqlite requires langchain-community; install it "
+                "(uv add langchain-community) or set LLM_CACHE=memory"
+            ) from e
+
+        return SQLiteCache(database_path=os.getenv("LLM_CACHE_DB", ".llm_cache.db"))
+    raise ValueError(f"Unknown LLM_CACHE backend {backend!r}; expected memory, sqlite or off")
+
+
+@functools.lru_cache(maxsize=1)
+def get_model() -> ChatGoogleGenerativeAI:
+    """
+    The Gemini chat model, shared by every request in this process.
+
+    Its google-genai client owns a single pooled httpx connection, so TCP/TLS
+    setup is paid once per worker; main.py closes it on shutdown.
+    """
+    # Stream tokens so the AG-UI endpoint can flush them as they arrive.
+    # temperature=0 keeps onboarding replies stable, which also makes cached
+    # responses indistinguishable from fresh ones.
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash",
+        temperature=0,
+        streaming=True,
+        cache=build_llm_cache(),
+        client_args={
+            "limits": httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        },
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def get_graph(checkpointer: BaseCheckpointSaver | None = None):
+    """
+    Build and compile the orchestrator graph once per process.
+
+    main.py passes a durable checkpointer opened in the FastAPI lifespan;
+    without one the graph falls back to an in-memory saver.
+    """
+    model = get_model()
+
+    # System prompt + tool schema are identical on every turn, so they can be
+    # served from a Gemini context cache. Off by default: the prefix is ~800
+    # tokens, below Gemini's minimum size for explicit caching, so creating
+    # the cache would fail (a blocking API call) once per TTL window. Set
+    # GEMINI_CACHE_TTL > 0 once the prompt and tools outgrow that minimum.
+    cache_ttl = int(os.getenv("GEMINI_CACHE_TTL", "0"))
+    middleware = list(BASE_MIDDLEWARE)
+    if cache_ttl > 0:
+        middleware.append(
+            GeminiContextCacheMiddleware(
+                model=model,
+                system_prompt=ORCHESTRATOR_PROMPT,
+                tools=ALL_TOOLS,
+                ttl_seconds=cache_ttl,
+            )
+        )
+
+    return create_agent(
+        model=model,
+        tools=ALL_TOOLS,
+        middleware=middleware,
+        state_schema=AgentState,
+        checkpointer=checkpointer or MemorySaver(),
+        system_prompt=ORCHESTRATOR_PROMPT,
+    )
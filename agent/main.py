@@ -5,51 +5,155 @@ Exposes the orchestrator agent via AG-UI protocol for CopilotKit.
 
 import os
 import json
+import atexit
 import logging
-import uvicorn
+import logging.handlers
+import queue
+from contextlib import asynccontextmanager
+
+# Load environment variables once, before any LangChain imports
 from dotenv import load_dotenv
+load_dotenv()
+os.environ["_ENV_LOADED"] = "1"
+
+import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from ag_ui_langgraph import add_langgraph_fastapi_endpoint
 from copilotkit import LangGraphAGUIAgent
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 
-from agents.orchestrator import graph
+def configure_logging() -> None:
+    """
+    Queue log records on the calling thread and write them to stderr from a
+    background listener, so logging never blocks requests.
 
-# Load environment variables
-load_dotenv()
+    main.py is executed more than once per process (as __main__, then again
+    as "main" when uvicorn imports main:app, or as __mp_main__ in spawned
+    workers), so this only installs the handler and listener once.
+    """
+    root_logger = logging.getLogger()
+    if any(isinstance(h, logging.handlers.QueueHandler) for h in root_logger.handlers):
+        return
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-)
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    log_handler = logging.StreamHandler()
+    log_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s"))
+    log_listener = logging.handlers.QueueListener(log_queue, log_handler)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    root_logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+
+configure_logging()
 logger = logging.getLogger("fractional_quest")
 
+# Add the LangGraph AG-UI endpoint
+def register_agent_endpoint(app: FastAPI, graph) -> None:
+    """Mount the orchestrator graph at / via AG-UI."""
+    logger.info("Registering AG-UI endpoint at /")
+    add_langgraph_fastapi_endpoint(
+        app=app,
+        agent=LangGraphAGUIAgent(
+            name="fractional_quest",
+            description="AI career assistant for fractional executives seeking CTO, CFO, CMO and other C-level roles.",
+            graph=graph,
+        ),
+        path="/",
+    )
+    logger.info("AG-UI endpoint registered successfully")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open the SQLite checkpointer on the running event loop, then build the
+    graph and mount it. Checkpoints survive restarts and are shared by all
+    workers pointing at the same CHECKPOINT_DB. The model's pooled HTTP
+    connections are closed on shutdown.
+    """
+    from agents.orchestrator import get_graph, get_model
+
+    async with AsyncSqliteSaver.from_conn_string(os.getenv("CHECKPOINT_DB", "checkpoints.db")) as checkpointer:
+        app.state.graph = get_graph(checkpointer)
+        register_agent_endpoint(app, app.state.graph)
+        try:
+            yield
+        finally:
+            await get_model().client.aio.aclose()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Fractional Quest Agent",
     description="AI-powered career assistant for fractional executives",
     version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
-# Configure CORS - allow all origins for CopilotKit
+# Configure CORS - explicit origins so credentialed requests are allowed and
+# preflight responses can be cached by the browser
+cors_origins = [
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGINS", os.getenv("FRONTEND_URL", "http://localhost:3000")).split(",")
+    if origin.strip()
+]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=600,
 )
 
 
+class SSEHeadersMiddleware:
+    """
+    Stops proxies and browsers from buffering or caching the AG-UI event
+    stream. Plain ASGI so the stream is not re-wrapped in a task and memory
+    stream; only requests to the AG-UI route (POST /) are touched.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] != "/" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if headers.get("content-type", "").startswith("text/event-stream"):
+                    headers["Cache-Control"] = "no-cache"
+                    headers["X-Accel-Buffering"] = "no"
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+app.add_middleware(SSEHeadersMiddleware)
+
+
 # Debug middleware to log all requests (without consuming body)
-@app.middleware("http")
-async def debug_middleware(request: Request, call_next):
-    logger.info(f">>> {request.method} {request.url.path}")
-    response = await call_next(request)
-    logger.info(f"<<< {request.method} {request.url.path} -> {response.status_code}")
-    return response
+if os.getenv("DEBUG"):
+    @app.middleware("http")
+    async def debug_middleware(request: Request, call_next):
+        if not logger.isEnabledFor(logging.DEBUG):
+            return await call_next(request)
+        logger.debug(f">>> {request.method} {request.url.path}")
+        response = await call_next(request)
+        logger.debug(f"<<< {request.method} {request.url.path} -> {response.status_code}")
+        return response
 
 
 # Health check endpoint
@@ -66,7 +170,8 @@ async def health_check():
 
 # Debug endpoint to test agent directly
 @app.get("/debug")
-async def debug_info():
+async def debug_info(request: Request):
+    graph = request.app.state.graph
     return {
         "graph_type": str(type(graph)),
         "graph_nodes": list(graph.nodes.keys()) if hasattr(graph, 'nodes') else "N/A",
@@ -77,32 +182,22 @@ async def debug_info():
     }
 
 
-# Add the LangGraph AG-UI endpoint
-logger.info("Registering AG-UI endpoint at /")
-add_langgraph_fastapi_endpoint(
-    app=app,
-    agent=LangGraphAGUIAgent(
-        name="fractional_quest",
-        description="AI career assistant for fractional executives seeking CTO, CFO, CMO and other C-level roles.",
-        graph=graph,
-    ),
-    path="/",
-)
-logger.info("AG-UI endpoint registered successfully")
-
-
 def main():
     """Run the uvicorn server."""
     port = int(os.getenv("PORT", "8123"))
     host = os.getenv("HOST", "0.0.0.0")
+    workers = int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1))
 
-    logger.info(f"Starting Fractional Quest Agent on http://{host}:{port}")
+    logger.info(f"Starting Fractional Quest Agent on http://{host}:{port} with {workers} workers")
     logger.info(f"GOOGLE_API_KEY set: {bool(os.getenv('GOOGLE_API_KEY'))}")
 
     uvicorn.run(
         "main:app",
         host=host,
         port=port,
+        workers=workers,
+        loop="auto",
+        http="auto",
         reload=False,
     )
 
@@ -1,6 +1,10 @@
 """
 State models for the Deep Agent.
 Uses CopilotKitState (TypedDict) as base for automatic frontend sync.
+
+All state is plain TypedDicts (no Pydantic models): tools and CopilotKit
+state syncs pass dicts straight through without per-field validation or
+model_dump() round-trips.
 """
 
 from typing import List, Optional
@@ -66,3 +70,56 @@ class AgentState(CopilotKitState, total=False):
     onboarding: OnboardingState
     page_context: PageContext
     active_agent: Optional[str]
+
+
+# ============================================
+# State -> Prompt Context
+# ============================================
+
+# Stable facts, emitted first in a fixed order so filling in one field never
+# shifts the bytes of the others
+PROFILE_FIELDS = (
+    "role_preference",
+    "trinity",
+    "years_experience",
+    "industries",
+    "location",
+    "remote_preference",
+    "target_compensation",
+    "availability",
+)
+
+
+def _format_value(value) -> str:
+    if value is None or value == []:
+        return "unknown"
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value)
+    return str(value)
+
+
+def state_to_context(state: AgentState) -> str:
+    """
+    Render the agent state as a prompt block for the model.
+
+    The system prompt and tool schema form the (cached) request prefix; this
+    block is appended after the conversation. Sections are always emitted in
+    the same order: the stable profile first, then the mutable session
+    progress (current step, page) last. `active_agent` is left out until
+    subagents exist to set it.
+    """
+    onboarding = state.get("onboarding") or {}
+    page = state.get("page_context") or {}
+
+    lines = ["## User Profile"]
+    for field in PROFILE_FIELDS:
+        lines.append(f"- {field}: {_format_value(onboarding.get(field))}")
+
+    lines.append("")
+    lines.append("## Session")
+    lines.append(f"- onboarding_step: {_format_value(onboarding.get('current_step'))}")
+    lines.append(f"- onboarding_completed: {bool(onboarding.get('completed'))}")
+    lines.append(f"- current_page: {_format_value(page.get('current_page'))}")
+    lines.append(f"- page_type: {_format_value(page.get('page_type'))}")
+
+    return "\n".join(lines)
@@ -0,0 +1,133 @@
+"""
+Tests for GeminiContextCacheMiddleware, with the Gemini cache API mocked.
+
+Run from the agent directory: python -m unittest discover -s tests
+"""
+
+import asyncio
+import unittest
+from unittest import mock
+
+from langchain.agents.middleware import ModelRequest, ModelResponse
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agents.middleware import GeminiContextCacheMiddleware
+from tools.onboarding import confirm_onboarding_step
+
+PROMPT = "You are a test prompt."
+TOOLS = [confirm_onboarding_step]
+
+
+def _request(tools=None, system_prompt=PROMPT) -> ModelRequest:
+    return ModelRequest(
+        model=FakeMessagesListChatModel(responses=[]),
+        messages=[HumanMessage(content="hi")],
+        system_prompt=system_prompt,
+        tools=list(TOOLS if tools is None else tools),
+    )
+
+
+class RecordingHandler:
+    """Model handler that records the request it was called with."""
+
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, request: ModelRequest) -> ModelResponse:
+        self.requests.append(request)
+        return ModelResponse(result=[AIMessage(content="ok")])
+
+
+class ContextCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch(
+            "agents.middleware.create_context_cache",
+            return_value="cachedContents/test",
+        )
+        self.create_cache = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _middleware(self, ttl_seconds: int = 3600) -> GeminiContextCacheMiddleware:
+        return GeminiContextCacheMiddleware(
+            model=mock.sentinel.model,
+            system_prompt=PROMPT,
+            tools=TOOLS,
+            ttl_seconds=ttl_seconds,
+        )
+
+    def test_cached_request_drops_prefix(self):
+        handler = RecordingHandler()
+        self._middleware().wrap_model_call(_request(), handler)
+
+        sent = handler.requests[0]
+        self.assertIsNone(sent.system_message)
+        self.assertEqual(sent.tools, [])
+        self.assertEqual(sent.model_settings["cached_content"], "cachedContents/test")
+
+    def test_cache_reused_within_ttl(self):
+        middleware = self._middleware()
+        for _ in range(5):
+            middleware.wrap_model_call(_request(), RecordingHandler())
+        self.create_cache.assert_called_once()
+
+    def test_short_ttl_not_recreated_every_call(self):
+        middleware = self._middleware(ttl_seconds=30)
+        for _ in range(5):
+            middleware.wrap_model_call(_request(), RecordingHandler())
+        self.create_cache.assert_called_once()
+
+    def test_expired_cache_is_recreated(self):
+        middleware = self._middleware()
+        middleware.wrap_model_call(_request(), RecordingHandler())
+        middleware._expires_at = 0.0
+        middleware.wrap_model_call(_request(), RecordingHandler())
+        self.assertEqual(self.create_cache.call_count, 2)
+
+    def test_failed_creation_falls_back_until_next_window(self):
+        self.create_cache.side_effect = RuntimeError("too few tokens")
+        middleware = self._middleware()
+        handler = RecordingHandler()
+        request = _request()
+
+        middleware.wrap_model_call(request, handler)
+        middleware.wrap_model_call(request, handler)
+
+        self.create_cache.assert_called_once()
+        self.assertIs(handler.requests[0], request)
+        self.assertIs(handler.requests[1], request)
+
+    def test_mismatched_tools_pass_through(self):
+        handler = RecordingHandler()
+        frontend_action = {"name": "navigate", "description": "", "parameters": {}}
+        request = _request(tools=[*TOOLS, frontend_action])
+
+        self._middleware().wrap_model_call(request, handler)
+
+        self.create_cache.assert_not_called()
+        self.assertIs(handler.requests[0], request)
+
+    def test_different_prompt_passes_through(self):
+        handler = RecordingHandler()
+        request = _request(system_prompt="Another prompt.")
+
+        self._middleware().wrap_model_call(request, handler)
+
+        self.create_cache.assert_not_called()
+        self.assertIs(handler.requests[0], request)
+
+    def test_async_uses_cache(self):
+        handler = RecordingHandler()
+
+        async def ahandler(request):
+            return handler(request)
+
+        asyncio.run(self._middleware().awrap_model_call(_request(), ahandler))
+
+        self.create_cache.assert_called_once()
+        self.assertEqual(handler.requests[0].model_settings["cached_content"], "cachedContents/test")
+
+
+if __name__ == "__main__":
+    unittest.main()
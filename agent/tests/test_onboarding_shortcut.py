@@ -0,0 +1,97 @@
+"""
+Tests for OnboardingShortcutMiddleware.
+
+The shortcut is the only path that writes onboarding state without the
+model, so it must only fire on replies that cleanly answer the step.
+
+Run from the agent directory: python -m unittest discover -s tests
+"""
+
+import unittest
+
+from langchain.agents.middleware import ModelRequest
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agents.middleware import OnboardingShortcutMiddleware
+
+
+def _request(text: str, current_step: str) -> ModelRequest:
+    return ModelRequest(
+        model=FakeMessagesListChatModel(responses=[]),
+        messages=[HumanMessage(content=text)],
+        state={"onboarding": {"current_step": current_step}},
+    )
+
+
+def _shortcut_args(text: str, current_step: str):
+    response = OnboardingShortcutMiddleware()._shortcut(_request(text, current_step))
+    if response is None:
+        return None
+    return response.result[0].tool_calls[0]["args"]
+
+
+class ShortcutMatchesCleanAnswers(unittest.TestCase):
+
+    def test_bare_role(self):
+        self.assertEqual(
+            _shortcut_args("CTO", "role_preference"),
+            {"step": "role_preference", "role": "cto"},
+        )
+
+    def test_role_with_filler(self):
+        self.assertEqual(
+            _shortcut_args("I'm a CFO.", "intro"),
+            {"step": "role_preference", "role": "cfo"},
+        )
+
+    def test_engagement_with_filler(self):
+        self.assertEqual(
+            _shortcut_args("Fractional work please", "trinity"),
+            {"step": "trinity", "engagement_type": "fractional"},
+        )
+
+
+class ShortcutDefersToModel(unittest.TestCase):
+
+    def assertDefers(self, text: str, current_step: str):
+        self.assertIsNone(_shortcut_args(text, current_step), text)
+
+    def test_questions(self):
+        self.assertDefers("What does a CPO do?", "role_preference")
+        self.assertDefers("what is interim?", "trinity")
+        self.assertDefers("cto?", "role_preference")
+
+    def test_negations(self):
+        self.assertDefers("not CFO", "role_preference")
+        self.assertDefers("no, not fractional", "trinity")
+        self.assertDefers("I don't want interim", "trinity")
+        self.assertDefers("CTO rather than CFO", "role_preference")
+        self.assertDefers("advisory rather than interim", "trinity")
+
+    def test_hedges(self):
+        self.assertDefers("I'm not sure, maybe cto?", "role_preference")
+        self.assertDefers("maybe cto", "role_preference")
+
+    def test_unrelated_words(self):
+        self.assertDefers("I used to be a CTO at a startup", "role_preference")
+        self.assertDefers("CTO or CFO", "role_preference")
+
+    def test_keyword_for_another_step(self):
+        self.assertDefers("fractional", "role_preference")
+
+    def test_not_a_fresh_user_turn(self):
+        request = _request("CTO", "role_preference")
+        request = request.override(messages=[*request.messages, AIMessage(content="ok")])
+        self.assertIsNone(OnboardingShortcutMiddleware()._shortcut(request))
+
+    def test_completed_onboarding(self):
+        request = _request("CTO", "role_preference")
+        request = request.override(
+            state={"onboarding": {"current_step": "role_preference", "completed": True}}
+        )
+        self.assertIsNone(OnboardingShortcutMiddleware()._shortcut(request))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Tests for the confirm_onboarding_step dispatcher, the tool that writes
+confirmed onboarding answers into graph state.
+
+Run from the agent directory: python -m unittest discover -s tests
+"""
+
+import json
+import unittest
+
+from langgraph.types import Command
+
+from tools.onboarding import confirm_onboarding_step
+
+
+def _confirm(onboarding=None, **args):
+    state = {"onboarding": onboarding} if onboarding is not None else {}
+    return confirm_onboarding_step.func(state=state, tool_call_id="call_1", **args)
+
+
+def _summary(command: Command) -> dict:
+    return json.loads(command.update["messages"][0].content)
+
+
+class StateUpdateTest(unittest.TestCase):
+
+    def test_merges_into_existing_onboarding(self):
+        command = _confirm(
+            {"current_step": "trinity", "role_preference": "cto"},
+            step="trinity",
+            engagement_type="Fractional",
+        )
+
+        self.assertEqual(command.update["onboarding"], {
+            "current_step": "experience",
+            "role_preference": "cto",
+            "trinity": "fractional",
+        })
+        self.assertEqual(_summary(command), {
+            "success": True,
+            "message": "Engagement type set to fractional.",
+            "next_step": "experience",
+        })
+
+    def test_does_not_mutate_input_state(self):
+        onboarding = {"current_step": "role_preference"}
+        _confirm(onboarding, step="role_preference", role="cfo")
+        self.assertEqual(onboarding, {"current_step": "role_preference"})
+
+    def test_industries_stored_as_list(self):
+        command = _confirm(
+            {"role_preference": "cto", "trinity": "interim"},
+            step="experience",
+            years=12,
+            industries=["fintech", "saas"],
+        )
+
+        onboarding = command.update["onboarding"]
+        self.assertEqual(onboarding["industries"], ["fintech", "saas"])
+        self.assertIsInstance(onboarding["industries"], list)
+        self.assertEqual(onboarding["years_experience"], 12)
+        self.assertEqual(onboarding["current_step"], "location")
+
+    def test_correcting_earlier_answer_keeps_progress(self):
+        onboarding = {
+            "current_step": "location",
+            "role_preference": "cto",
+            "trinity": "fractional",
+            "years_experience": 10,
+            "industries": ["saas"],
+        }
+        command = _confirm(onboarding, step="role_preference", role="cfo")
+
+        self.assertEqual(command.update["onboarding"]["role_preference"], "cfo")
+        self.assertEqual(command.update["onboarding"]["current_step"], "location")
+        self.assertEqual(_summary(command)["next_step"], "location")
+
+    def test_complete(self):
+        command = _confirm({"current_step": "completed"}, step="complete")
+
+        self.assertTrue(command.update["onboarding"]["completed"])
+        self.assertEqual(command.update["onboarding"]["current_step"], "completed")
+        self.assertNotIn("next_step", _summary(command))
+
+    def test_tool_message(self):
+        message = _confirm(step="role_preference", role="cto").update["messages"][0]
+        self.assertEqual(message.name, "confirm_onboarding_step")
+        self.assertEqual(message.tool_call_id, "call_1")
+
+
+class ErrorPathTest(unittest.TestCase):
+
+    def test_missing_arguments(self):
+        result = _confirm(step="location", location="London")
+        self.assertEqual(result, {
+            "success": False,
+            "error": "Missing remote_preference for step location.",
+        })
+
+    def test_invalid_value(self):
+        result = _confirm(step="trinity", engagement_type="part-time")
+        self.assertFalse(result["success"])
+        self.assertIn("Invalid engagement type", result["error"])
+
+    def test_invalid_step(self):
+        result = _confirm(step="salary")
+        self.assertFalse(result["success"])
+        self.assertIn("Invalid step", result["error"])
+
+    def test_errors_are_json_serializable(self):
+        result = _confirm(step="search_prefs", availability="someday")
+        json.dumps(result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,19 +1,7 @@
 """Tools for the Deep Agent system."""
 
-from tools.onboarding import (
-    confirm_role_preference,
-    confirm_trinity,
-    confirm_experience,
-    confirm_location,
-    confirm_search_prefs,
-    complete_onboarding,
-)
+from tools.onboarding import confirm_onboarding_step
 
 __all__ = [
-    "confirm_role_preference",
-    "confirm_trinity",
-    "confirm_experience",
-    "confirm_location",
-    "confirm_search_prefs",
-    "complete_onboarding",
+    "confirm_onboarding_step",
 ]
@@ -1,19 +1,36 @@
 """
 Onboarding tools for the 6-step profile building process.
 
-These tools validate user input and return structured data.
-State updates are handled by the graph's state management.
+A single `confirm_onboarding_step` tool is exposed to the model and
+dispatches to the per-step validators below, keeping the tool schema
+sent with every request small. Validators return structured data; the
+dispatcher writes confirmed values into `state.onboarding` and only sends
+a short confirmation back to the model.
 """
 
-from typing import List, Optional
+import json
+import sys
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Annotated, Any, List, Literal, Mapping, Optional
+
+from langchain.tools import InjectedState, InjectedToolCallId
+from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
+from langgraph.types import Command
+
+from state import PROFILE_FIELDS
+
+
+def _normalize(value: str) -> str:
+    return value.strip().lower()
 
 
 # ============================================
 # Step 2: Role Preference
 # ============================================
 
-VALID_ROLES = [
+VALID_ROLES_DISPLAY = (
     "cto",      # Chief Technology Officer
     "cfo",      # Chief Financial Officer
     "cmo",      # Chief Marketing Officer
@@ -23,14 +40,26 @@ VALID_ROLES = [
     "chro",     # Chief Human Resources Officer
     "ciso",     # Chief Information Security Officer
     "other",    # Other C-level or executive role
-]
+)
+VALID_ROLES = frozenset(map(sys.intern, VALID_ROLES_DISPLAY))
+_ROLES_ERR = f"Invalid role. Valid options: {', '.join(VALID_ROLES_DISPLAY)}"
+
+# Success responses depend only on the role, so they are built once and
+# shared read-only
+_ROLE_RESPONSES = {
+    role: MappingProxyType({
+        "success": True,
+        "message": f"Role preference set to {role.upper()}.",
+        "role_preference": role,
+        "next_step": "trinity",
+    })
+    for role in VALID_ROLES_DISPLAY
+}
 
 
-@tool
-def confirm_role_preference(role: str) -> dict:
+def confirm_role_preference(role: str) -> Mapping[str, Any]:
     """
     Confirm the user's primary executive role preference.
-    Call this when the user tells you what role they're looking for.
 
     Args:
         role: The role type (cto, cfo, cmo, coo, cro, cpo, chro, ciso, other)
@@ -38,40 +67,49 @@ def confirm_role_preference(role: str) -> dict:
     Returns:
         Confirmation of the role preference
     """
-    role_lower = role.lower().strip()
+    # Fast path: the model usually sends the canonical value already
+    if role in VALID_ROLES:
+        return _ROLE_RESPONSES[role]
+
+    role_lower = _normalize(role)
 
     if role_lower not in VALID_ROLES:
         return {
             "success": False,
-            "error": f"Invalid role. Valid options: {', '.join(VALID_ROLES)}",
-            "valid_roles": VALID_ROLES,
+            "error": _ROLES_ERR,
+            "valid_roles": VALID_ROLES_DISPLAY,
         }
 
-    return {
-        "success": True,
-        "message": f"Role preference set to {role_lower.upper()}.",
-        "role_preference": role_lower,
-        "next_step": "trinity",
-    }
+    return _ROLE_RESPONSES[role_lower]
 
 
 # ============================================
 # Step 3: Trinity (Engagement Type)
 # ============================================
 
-VALID_TRINITY = [
+VALID_TRINITY_DISPLAY = (
     "fractional",   # Part-time, ongoing engagement
     "interim",      # Full-time, temporary engagement
     "advisory",     # Strategic advisor role
     "all",          # Open to all types
-]
+)
+VALID_TRINITY = frozenset(map(sys.intern, VALID_TRINITY_DISPLAY))
+_TRINITY_ERR = f"Invalid engagement type. Valid options: {', '.join(VALID_TRINITY_DISPLAY)}"
+
+_TRINITY_RESPONSES = {
+    engagement: MappingProxyType({
+        "success": True,
+        "message": f"Engagement type set to {engagement}.",
+        "trinity": engagement,
+        "next_step": "experience",
+    })
+    for engagement in VALID_TRINITY_DISPLAY
+}
 
 
-@tool
-def confirm_trinity(engagement_type: str) -> dict:
+def confirm_trinity(engagement_type: str) -> Mapping[str, Any]:
     """
     Confirm the user's preferred engagement type.
-    Call this when the user indicates their preference for fractional, interim, or advisory roles.
 
     Args:
         engagement_type: fractional, interim, advisory, or all
@@ -79,32 +117,44 @@ def confirm_trinity(engagement_type: str) -> dict:
     Returns:
         Confirmation of the engagement type preference
     """
-    engagement_lower = engagement_type.lower().strip()
+    if engagement_type in VALID_TRINITY:
+        return _TRINITY_RESPONSES[engagement_type]
+
+    engagement_lower = _normalize(engagement_type)
 
     if engagement_lower not in VALID_TRINITY:
         return {
             "success": False,
-            "error": f"Invalid engagement type. Valid options: {', '.join(VALID_TRINITY)}",
-            "valid_types": VALID_TRINITY,
+            "error": _TRINITY_ERR,
+            "valid_types": VALID_TRINITY_DISPLAY,
         }
 
-    return {
-        "success": True,
-        "message": f"Engagement type set to {engagement_lower}.",
-        "trinity": engagement_lower,
-        "next_step": "experience",
-    }
+    return _TRINITY_RESPONSES[engagement_lower]
 
 
 # ============================================
 # Step 4: Experience
 # ============================================
 
-@tool
-def confirm_experience(years: int, industries: List[str]) -> dict:
+@lru_cache(maxsize=512)
+def _join_industries(industries: tuple) -> str:
+    return ", ".join(industries)
+
+
+@lru_cache(maxsize=256)
+def _confirm_experience_cached(years: int, industries: tuple) -> Mapping[str, Any]:
+    return MappingProxyType({
+        "success": True,
+        "message": f"{years} years of experience across {_join_industries(industries)}.",
+        "years_experience": years,
+        "industries": industries,
+        "next_step": "location",
+    })
+
+
+def confirm_experience(years: int, industries: List[str]) -> Mapping[str, Any]:
     """
     Confirm the user's experience level and industries.
-    Call this when the user shares their years of experience and industry background.
 
     Args:
         years: Years of executive experience
@@ -118,33 +168,60 @@ def confirm_experience(years: int, industries: List[str]) -> dict:
             "success": False,
             "error": "Years of experience must be a positive number",
         }
+    if not industries or not isinstance(industries, (list, tuple)):
+        return {
+            "success": False,
+            "error": "Provide at least one industry as a list",
+        }
 
-    return {
-        "success": True,
-        "message": f"{years} years of experience across {', '.join(industries)}.",
-        "years_experience": years,
-        "industries": industries,
-        "next_step": "location",
-    }
+    # Keep the user's ordering; it is echoed back in the message
+    return _confirm_experience_cached(years, tuple(industries))
 
 
 # ============================================
 # Step 5: Location
 # ============================================
 
-VALID_REMOTE_PREFS = [
+VALID_REMOTE_PREFS_DISPLAY = (
     "remote",       # Fully remote only
     "hybrid",       # Mix of remote and onsite
     "onsite",       # In-person only
     "flexible",     # Open to any arrangement
-]
+)
+VALID_REMOTE_PREFS = frozenset(map(sys.intern, VALID_REMOTE_PREFS_DISPLAY))
+# Maps any equal string back to the interned constant, so cache keys and
+# responses share one object per value
+_REMOTE_PREFS_CANONICAL = {pref: pref for pref in VALID_REMOTE_PREFS}
+_REMOTE_PREFS_ERR = f"Invalid remote preference. Valid options: {', '.join(VALID_REMOTE_PREFS_DISPLAY)}"
+
+# remote preference -> (response template, message suffix); only the
+# user-provided location is filled in per call
+_LOCATION_RESPONSES = {
+    pref: (
+        MappingProxyType({
+            "success": True,
+            "remote_preference": pref,
+            "next_step": "search_prefs",
+        }),
+        f" with {pref} work preference.",
+    )
+    for pref in VALID_REMOTE_PREFS_DISPLAY
+}
+
+
+@lru_cache(maxsize=256)
+def _confirm_location_cached(location: str, remote_preference: str) -> Mapping[str, Any]:
+    template, suffix = _LOCATION_RESPONSES[remote_preference]
+    return MappingProxyType({
+        **template,
+        "message": "Based in " + location + suffix,
+        "location": location,
+    })
 
 
-@tool
-def confirm_location(location: str, remote_preference: str) -> dict:
+def confirm_location(location: str, remote_preference: str) -> Mapping[str, Any]:
     """
     Confirm the user's location and remote work preferences.
-    Call this when the user shares where they are based and their work arrangement preference.
 
     Args:
         location: City, region, or country
@@ -153,36 +230,89 @@ def confirm_location(location: str, remote_preference: str) -> dict:
     Returns:
         Confirmation of location details
     """
-    remote_lower = remote_preference.lower().strip()
-
-    if remote_lower not in VALID_REMOTE_PREFS:
+    canonical = (
+        _REMOTE_PREFS_CANONICAL.get(remote_preference)
+        or _REMOTE_PREFS_CANONICAL.get(_normalize(remote_preference))
+    )
+    if canonical is None:
         return {
             "success": False,
-            "error": f"Invalid remote preference. Valid options: {', '.join(VALID_REMOTE_PREFS)}",
-            "valid_preferences": VALID_REMOTE_PREFS,
+            "error": _REMOTE_PREFS_ERR,
+            "valid_preferences": VALID_REMOTE_PREFS_DISPLAY,
         }
 
-    return {
-        "success": True,
-        "message": f"Based in {location} with {remote_lower} work preference.",
-        "location": location,
-        "remote_preference": remote_lower,
-        "next_step": "search_prefs",
-    }
+    return _confirm_location_cached(location, canonical)
 
 
 # ============================================
 # Step 6: Search Preferences
 # ============================================
 
-@tool
+_AVAILABILITY_DISPLAY = {
+    "immediately": "immediately",
+    "2_weeks": "2 weeks",
+    "1_month": "1 month",
+    "flexible": "flexible",
+}
+_AVAILABILITY_OPTIONS = tuple(_AVAILABILITY_DISPLAY)
+_VALID_AVAILABILITY = frozenset(map(sys.intern, _AVAILABILITY_OPTIONS))
+# The success message shows "2 weeks", so the model may send that form (or
+# "2-weeks") back; accept both as aliases of the canonical value
+_AVAILABILITY_CANONICAL = {
+    alias: availability
+    for availability in _VALID_AVAILABILITY
+    for alias in (
+        availability,
+        _AVAILABILITY_DISPLAY[availability],
+        availability.replace("_", "-"),
+    )
+}
+_AVAILABILITY_ERR = f"Invalid availability. Valid options: {', '.join(_AVAILABILITY_OPTIONS)}"
+
+# availability -> (response template, message suffix); only the
+# compensation target is filled in per call
+_SEARCH_PREFS_RESPONSES = {
+    availability: (
+        MappingProxyType({
+            "success": True,
+            "availability": availability,
+            "next_step": "completed",
+        }),
+        f", available {display}.",
+    )
+    for availability, display in _AVAILABILITY_DISPLAY.items()
+}
+
+# availability -> full response when no compensation target was given
+_DEFAULT_SEARCH_PREFS_RESPONSES = {
+    availability: MappingProxyType({
+        **template,
+        "message": "Looking for competitive compensation" + suffix,
+        "target_compensation": None,
+    })
+    for availability, (template, suffix) in _SEARCH_PREFS_RESPONSES.items()
+}
+
+
+@lru_cache(maxsize=256)
+def _confirm_search_prefs_cached(
+    target_compensation: Optional[str],
+    availability: str,
+) -> Mapping[str, Any]:
+    template, suffix = _SEARCH_PREFS_RESPONSES[availability]
+    return MappingProxyType({
+        **template,
+        "message": "Looking for " + (target_compensation or "competitive compensation") + suffix,
+        "target_compensation": target_compensation,
+    })
+
+
 def confirm_search_prefs(
     target_compensation: Optional[str],
     availability: str,
-) -> dict:
+) -> Mapping[str, Any]:
     """
     Confirm the user's search preferences including compensation and availability.
-    Call this when the user shares their salary expectations and when they can start.
 
     Args:
         target_compensation: Target compensation range (e.g., "$200-300k", "open")
@@ -191,31 +321,171 @@ def confirm_search_prefs(
     Returns:
         Confirmation of search preferences
     """
-    return {
-        "success": True,
-        "message": f"Looking for {target_compensation or 'competitive compensation'}, "
-                   f"available {availability.replace('_', ' ')}.",
-        "target_compensation": target_compensation,
-        "availability": availability,
-        "next_step": "completed",
-    }
+    canonical = (
+        _AVAILABILITY_CANONICAL.get(availability)
+        or _AVAILABILITY_CANONICAL.get(_normalize(availability))
+    )
+    if canonical is None:
+        return {
+            "success": False,
+            "error": _AVAILABILITY_ERR,
+            "valid_availability": _AVAILABILITY_OPTIONS,
+        }
+
+    if target_compensation is None:
+        return _DEFAULT_SEARCH_PREFS_RESPONSES[canonical]
+
+    return _confirm_search_prefs_cached(target_compensation, canonical)
 
 
 # ============================================
 # Complete Onboarding
 # ============================================
 
-@tool
-def complete_onboarding() -> dict:
+_COMPLETE_ONBOARDING_RESPONSE = MappingProxyType({
+    "success": True,
+    "message": "Your profile is complete! I can now help you find matching opportunities.",
+    "onboarding_completed": True,
+})
+
+
+def complete_onboarding() -> Mapping[str, Any]:
     """
-    Mark onboarding as complete. Call this after all 6 steps have been completed
-    and the user has confirmed their profile information.
+    Mark onboarding as complete once all 6 steps have been confirmed.
 
     Returns:
         Confirmation that onboarding is complete
     """
-    return {
-        "success": True,
-        "message": "Your profile is complete! I can now help you find matching opportunities.",
-        "onboarding_completed": True,
+    return _COMPLETE_ONBOARDING_RESPONSE
+
+
+# ============================================
+# Onboarding Step Dispatcher
+# ============================================
+
+OnboardingStep = Literal[
+    "role_preference",
+    "trinity",
+    "experience",
+    "location",
+    "search_prefs",
+    "complete",
+]
+
+# step -> (validator, required args, optional args)
+_STEP_HANDLERS = {
+    "role_preference": (confirm_role_preference, ("role",), ()),
+    "trinity": (confirm_trinity, ("engagement_type",), ()),
+    "experience": (confirm_experience, ("years", "industries"), ()),
+    "location": (confirm_location, ("location", "remote_preference"), ()),
+    "search_prefs": (confirm_search_prefs, ("availability",), ("target_compensation",)),
+    "complete": (complete_onboarding, (), ()),
+}
+
+# Profile steps in order, each with the field that marks it as confirmed
+_STEP_ORDER = (
+    ("role_preference", "role_preference"),
+    ("trinity", "trinity"),
+    ("experience", "years_experience"),
+    ("location", "location"),
+    ("search_prefs", "availability"),
+)
+
+
+def _next_step(onboarding: Mapping[str, Any]) -> str:
+    """The first step whose field is still unconfirmed."""
+    for step, field in _STEP_ORDER:
+        if onboarding.get(field) is None:
+            return step
+    return "completed"
+
+
+@tool
+def confirm_onboarding_step(
+    step: OnboardingStep,
+    role: Optional[str] = None,
+    engagement_type: Optional[str] = None,
+    years: Optional[int] = None,
+    industries: Optional[List[str]] = None,
+    location: Optional[str] = None,
+    remote_preference: Optional[str] = None,
+    target_compensation: Optional[str] = None,
+    availability: Optional[str] = None,
+    state: Annotated[Optional[dict], InjectedState] = None,
+    tool_call_id: Annotated[Optional[str], InjectedToolCallId] = None,
+) -> dict | Command:
+    """
+    Confirm one onboarding step once the user has provided its information.
+    Only pass the arguments for the step being confirmed.
+
+    Args:
+        step: role_preference, trinity, experience, location, search_prefs, or complete
+        role: role_preference - cto, cfo, cmo, coo, cro, cpo, chro, ciso, other
+        engagement_type: trinity - fractional, interim, advisory, or all
+        years: experience - Years of executive experience
+        industries: experience - Industries they have experience in
+        location: location - City, region, or country
+        remote_preference: location - remote, hybrid, onsite, or flexible
+        target_compensation: search_prefs - Target compensation range (e.g., "$200-300k", "open")
+        availability: search_prefs - immediately, 2_weeks, 1_month, flexible
+
+    Returns:
+        Confirmation of the step, or an error describing what is missing or invalid.
+        Confirmed values are saved to the onboarding state.
+    """
+    if step not in _STEP_HANDLERS:
+        return {
+            "success": False,
+            "error": f"Invalid step. Valid options: {', '.join(_STEP_HANDLERS)}",
+        }
+
+    handler, required, optional = _STEP_HANDLERS[step]
+    args = {
+        "role": role,
+        "engagement_type": engagement_type,
+        "years": years,
+        "industries": industries,
+        "location": location,
+        "remote_preference": remote_preference,
+        "target_compensation": target_compensation,
+        "availability": availability,
     }
+
+    missing = [name for name in required if args[name] is None]
+    if missing:
+        return {
+            "success": False,
+            "error": f"Missing {', '.join(missing)} for step {step}.",
+        }
+
+    result = handler(**{name: args[name] for name in required + optional})
+    if not result["success"]:
+        return result
+
+    # The onboarding state is the single source of truth for confirmed values,
+    # so they are not echoed back in the tool output
+    onboarding = dict((state or {}).get("onboarding") or {})
+    for field in PROFILE_FIELDS:
+        if field in result:
+            value = result[field]
+            # Cached validator results hold tuples; state keeps plain lists
+            onboarding[field] = list(value) if isinstance(value, tuple) else value
+    # Progress follows what has been confirmed, so correcting an earlier
+    # answer never moves the user back to a step they already finished
+    summary = {"success": True, "message": result["message"]}
+    if result.get("onboarding_completed"):
+        onboarding["completed"] = True
+        onboarding["current_step"] = "completed"
+    else:
+        onboarding["current_step"] = summary["next_step"] = _next_step(onboarding)
+
+    return Command(update={
+        "onboarding": onboarding,
+        "messages": [
+            ToolMessage(
+                content=json.dumps(summary),
+                name="confirm_onboarding_step",
+                tool_call_id=tool_call_id,
+            )
+        ],
+    })